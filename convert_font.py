@@ -25,6 +25,8 @@ Arguments 参数:
 import os
 import sys
 import argparse
+import shutil
+import subprocess
 import time
 import logging
 from typing import Dict, Optional, Tuple, Any, List
@@ -49,12 +51,16 @@ SUPPORTED_FORMATS = {
 
 # 格式特定的转换标志
 FORMAT_FLAGS = {
-    'otf': ('opentype', 'round', 'dummy-dsig', 'apple'),
+    'otf': ('opentype', 'round', 'dummy-dsig', 'apple', 'short-post'),
     'ttf': ('opentype', 'round', 'dummy-dsig', 'apple', 'short-post', 'old-kern'),
     'woff2': ('opentype', 'round', 'dummy-dsig', 'no-flex', 'no-hints', 'short-post', 'omit-instructions'),
     # 其他格式使用默认设置
 }
 
+# 默认剥离 hinting（fpgm/prep/cvt 及字形指令字节码），
+# Web字体流程通常用不到，剥离后体积明显更小；--keep-hints 可保留
+STRIP_HINT_FLAGS = ('no-hints', 'omit-instructions')
+
 try:
     import fontforge
 except ModuleNotFoundError:
@@ -62,26 +68,58 @@ except ModuleNotFoundError:
     fontforge = None
 
 
+def _write_woff2_with_quality(ttf_path: str, output_path: str, quality: int) -> None:
+    """
+    用 fontTools 以指定的 Brotli 质量把TTF写出为 WOFF2。
+
+    fontTools 的 WOFF2 写出器固定使用 Brotli 默认质量（11），
+    这里临时替换其模块内的 brotli 引用来注入 quality 参数。
+    """
+    import brotli
+    from fontTools.ttLib import woff2 as woff2_module
+
+    class _QualityBrotli:
+        def __getattr__(self, name):
+            return getattr(brotli, name)
+
+        @staticmethod
+        def compress(data, **kwargs):
+            kwargs.setdefault('quality', quality)
+            return brotli.compress(data, **kwargs)
+
+    original_brotli = woff2_module.brotli
+    woff2_module.brotli = _QualityBrotli()
+    try:
+        woff2_module.compress(ttf_path, output_path)
+    finally:
+        woff2_module.brotli = original_brotli
+
+
 class FontConverter:
     """字体转换器类，封装所有字体处理逻辑"""
     
-    def __init__(self, input_path: str, output_path: Optional[str] = None, 
-                 format_type: str = 'woff2', family_name: Optional[str] = None, 
-                 version: Optional[str] = None):
+    def __init__(self, input_path: str, output_path: Optional[str] = None,
+                 format_type: str = 'woff2', family_name: Optional[str] = None,
+                 version: Optional[str] = None, brotli_quality: int = 11,
+                 keep_hints: bool = False):
         """
         初始化字体转换器
-        
+
         Args:
             input_path: 输入字体文件路径
             output_path: 输出字体文件路径（可选）
             format_type: 输出格式类型
             family_name: 字体族名称（可选）
             version: 字体版本号（可选）
+            brotli_quality: WOFF2 的 Brotli 压缩质量，1-11（可选）
+            keep_hints: 是否保留 hinting 指令（可选）
         """
         self.input_path = input_path
         self.format_type = format_type
         self.family_name = family_name
         self.version = version
+        self.brotli_quality = brotli_quality
+        self.keep_hints = keep_hints
         
         # 如果未指定输出路径，根据输入文件名生成
         if not output_path:
@@ -171,7 +209,12 @@ class FontConverter:
             
             # 获取特定格式的标志，如果未定义则使用默认值
             flags = FORMAT_FLAGS.get(self.format_type, ())
-            self.font.generate(self.output_path, flags=flags)
+            if self.format_type in ('ttf', 'otf') and not self.keep_hints:
+                flags = flags + STRIP_HINT_FLAGS
+            if self.format_type == 'woff2' and self._generate_woff2_native(flags):
+                pass
+            else:
+                self.font.generate(self.output_path, flags=flags)
     
             # 计算并显示统计信息
             self._show_conversion_stats(start_time)
@@ -189,6 +232,57 @@ class FontConverter:
                 except Exception:
                     pass
     
+    def _generate_woff2_native(self, flags: Tuple[str, ...]) -> bool:
+        """
+        优先用 Google 原生 woff2_compress 生成 WOFF2。
+
+        先生成中间TTF，再调用 woff2_compress —— 其针对字体变换调优的
+        Brotli 通常比 FontForge 内置写出器更快、产物也更小。
+        指定了低于 11 的 Brotli 质量时改走 fontTools 路径以注入质量参数。
+        工具不存在或调用失败时返回 False，回退到 FontForge 内置路径。
+        """
+        tmp_ttf = f"{self.output_path}.tmp.ttf"
+        tmp_woff2 = f"{self.output_path}.tmp.woff2"
+        try:
+            if self.brotli_quality < 11:
+                # 降低质量换速度：原生工具和 FontForge 都固定用最高质量，
+                # 只有 fontTools + brotli 这条路能注入 quality 参数
+                try:
+                    self.font.generate(tmp_ttf, flags=flags)
+                    # 先写临时文件再原子替换，压缩中途失败不会留下残缺输出
+                    _write_woff2_with_quality(tmp_ttf, tmp_woff2,
+                                              self.brotli_quality)
+                    os.replace(tmp_woff2, self.output_path)
+                    logger.info(f"已使用 Brotli 质量 {self.brotli_quality} 压缩")
+                    return True
+                except ImportError:
+                    logger.warning("未安装 fontTools/brotli，无法调整 Brotli 质量，"
+                                   "将以固定最高质量压缩")
+                except Exception as e:
+                    logger.warning(f"fontTools WOFF2 写出失败，"
+                                   f"回退到固定最高质量路径：{e}")
+
+            binary = shutil.which('woff2_compress')
+            if binary is None:
+                logger.info("未找到 woff2_compress，使用 FontForge 内置 WOFF2 写出器")
+                return False
+
+            self.font.generate(tmp_ttf, flags=flags)
+            subprocess.run([binary, tmp_ttf], check=True)
+            os.replace(tmp_woff2, self.output_path)
+            logger.info("已使用原生 woff2_compress 压缩")
+            return True
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.warning(f"woff2_compress 调用失败，回退到 FontForge 内置写出器：{e}")
+            return False
+        finally:
+            for tmp_path in (tmp_ttf, tmp_woff2):
+                if os.path.exists(tmp_path):
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+
     def _show_conversion_stats(self, start_time: float) -> None:
         """显示转换统计信息"""
         end_time = time.time()
@@ -232,6 +326,19 @@ def parse_arguments() -> argparse.Namespace:
     )
     parser.add_argument('--family-name', help='设置字体族名称')
     parser.add_argument('--version', help='设置字体版本号')
+    parser.add_argument(
+        '--brotli-quality',
+        type=int,
+        default=11,
+        choices=range(1, 12),
+        metavar='{1-11}',
+        help='WOFF2 的 Brotli 压缩质量（默认：11，数值越低速度越快、文件越大）'
+    )
+    parser.add_argument(
+        '--keep-hints',
+        action='store_true',
+        help='保留 hinting 指令（默认剥离 fpgm/prep/cvt 及字形指令以减小体积）'
+    )
 
     return parser.parse_args()
 
@@ -248,7 +355,9 @@ def main() -> int:
         args.output,
         args.format,
         args.family_name,
-        args.version
+        args.version,
+        args.brotli_quality,
+        args.keep_hints
     )
     
     success = converter.convert()
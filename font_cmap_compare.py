@@ -1,25 +1,67 @@
 import argparse
+import hashlib
+import tempfile
+import numpy as np
 from fontTools.ttLib import TTFont
 from fontTools.ttLib.tables._c_m_a_p import CmapSubtable
 import os
 
-def get_unicode_codepoints(font_path: str) -> set[int]:
+def get_unicode_codepoints(font_path: str) -> np.ndarray:
     """
-    从字体文件中提取所有Unicode码位。
+    从字体文件中提取所有Unicode码位，返回去重后已排序的int32数组。
     """
-    codepoints = set()
     try:
-        font = TTFont(font_path)
+        # lazy=True: 只在首次访问时解压对应表，跳过 glyf/GPOS 等无关表
+        font = TTFont(font_path, lazy=True)
         if 'cmap' not in font:
             print(f"警告: 字体文件 '{font_path}' 不包含 'cmap' 表。")
-            return codepoints
+            return np.empty(0, np.int32)
 
-        for table in font['cmap'].tables:
-            if isinstance(table, CmapSubtable):
-                codepoints.update(table.cmap.keys())
+        arrays = [
+            np.fromiter(table.cmap.keys(), dtype=np.int32, count=len(table.cmap))
+            for table in font['cmap'].tables
+            if isinstance(table, CmapSubtable)
+        ]
         font.close()
+        return np.unique(np.concatenate(arrays)) if arrays else np.empty(0, np.int32)
     except Exception as e:
         print(f"错误: 无法处理字体文件 '{font_path}': {e}")
+        return np.empty(0, np.int32)
+
+def get_cached_codepoints(font_path: str) -> np.ndarray:
+    """
+    带缓存地提取码位数组：以 (路径, mtime, 大小) 为键把结果存成 .npy
+    旁路文件，重复比较同一字体时直接 mmap 加载，跳过整个cmap解析。
+    """
+    try:
+        stat = os.stat(font_path)
+        key = hashlib.sha1(
+            f"{os.path.abspath(font_path)}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+        ).hexdigest()[:16]
+        cache_path = os.path.join(tempfile.gettempdir(), f"cmap_{key}.npy")
+        if os.path.exists(cache_path):
+            try:
+                return np.load(cache_path, mmap_mode='r')
+            except (OSError, EOFError, ValueError):
+                # 缓存残缺（写入被打断、磁盘写满）时删掉坏文件重新提取，
+                # 否则键里的 mtime/大小不变，坏缓存会一直命中
+                try:
+                    os.remove(cache_path)
+                except OSError:
+                    pass
+    except OSError:
+        cache_path = None
+
+    codepoints = get_unicode_codepoints(font_path)
+
+    if cache_path is not None and len(codepoints) > 0:
+        try:
+            # 先写临时文件再原子替换，中断不会留下残缺缓存
+            tmp_path = f"{cache_path}.tmp.npy"
+            np.save(tmp_path, codepoints)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
     return codepoints
 
 def compare_fonts_cmap(old_font_path: str, new_font_path: str):
@@ -40,25 +82,29 @@ def compare_fonts_cmap(old_font_path: str, new_font_path: str):
         return
 
     print("正在提取旧字体中的Unicode码位...")
-    old_codepoints = get_unicode_codepoints(old_font_path)
+    old_codepoints = get_cached_codepoints(old_font_path)
     print(f"旧字体包含 {len(old_codepoints)} 个Unicode码位。\n")
 
     print("正在提取新字体中的Unicode码位...")
-    new_codepoints = get_unicode_codepoints(new_font_path)
+    new_codepoints = get_cached_codepoints(new_font_path)
     print(f"新字体包含 {len(new_codepoints)} 个Unicode码位。\n")
 
     print("-" * 60)
     print("正在分析码位差异...")
     print("-" * 60 + "\n")
 
-    added_codepoints = new_codepoints - old_codepoints
-    removed_codepoints = old_codepoints - new_codepoints
+    added_codepoints = np.setdiff1d(new_codepoints, old_codepoints, assume_unique=True)
+    removed_codepoints = np.setdiff1d(old_codepoints, new_codepoints, assume_unique=True)
 
-    def format_codepoints(codepoint_set: set[int]) -> str:
+    def format_codepoints(codepoint_set) -> str:
         """将码位集合格式化为易读的字符串。"""
-        if not codepoint_set:
+        if len(codepoint_set) == 0:
             return "无"
-        sorted_codepoints = sorted(list(codepoint_set))
+        # NumPy集合运算的结果本身有序，无需再排序
+        if isinstance(codepoint_set, np.ndarray):
+            sorted_codepoints = codepoint_set
+        else:
+            sorted_codepoints = sorted(codepoint_set)
         # 显示前10个和后10个
         if len(sorted_codepoints) > 20:
             return ", ".join([f"U+{cp:04X}" for cp in sorted_codepoints[:10]]) + \
@@ -76,7 +122,7 @@ def compare_fonts_cmap(old_font_path: str, new_font_path: str):
     print(f"  列表: {format_codepoints(removed_codepoints)}\n")
 
     print("="*60)
-    if not added_codepoints and not removed_codepoints:
+    if len(added_codepoints) == 0 and len(removed_codepoints) == 0:
         print("🎉 两个字体的 'cmap' 表完全一致，没有发现码位差异。")
     else:
         print("✅ 码位差异分析完成。")
@@ -1,28 +1,87 @@
 import argparse
+import hashlib
 import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
 from fontTools.ttLib import TTFont
 from fontTools.ttLib.tables._c_m_a_p import CmapSubtable
-from fontTools.pens.recordingPen import RecordingPen
 
-def get_unicode_codepoints(font: TTFont) -> set[int]:
+
+class HashPen:
+    """
+    流式哈希笔：将轮廓绘制指令直接喂给 blake2b，
+    避免像 RecordingPen 那样为每个字形构建 (op, tuple) 指令列表。
+    比较两个字形只需比较16字节摘要。
+    """
+
+    _pack_point = struct.Struct('<2f').pack
+    _pack_transform = struct.Struct('<6f').pack
+
+    def __init__(self):
+        self.h = hashlib.blake2b(digest_size=16)
+
+    def reset(self) -> None:
+        """重置内部哈希状态，以便复用同一个笔实例。"""
+        self.h = hashlib.blake2b(digest_size=16)
+
+    def digest(self) -> bytes:
+        return self.h.digest()
+
+    def moveTo(self, pt):
+        self.h.update(b'M' + self._pack_point(*pt))
+
+    def lineTo(self, pt):
+        self.h.update(b'L' + self._pack_point(*pt))
+
+    def curveTo(self, *points):
+        update = self.h.update
+        update(b'C')
+        for pt in points:
+            update(self._pack_point(*pt))
+
+    def qCurveTo(self, *points):
+        update = self.h.update
+        update(b'Q')
+        for pt in points:
+            # TrueType 闭合二次曲线轮廓允许最后一个点为 None
+            update(b'N' if pt is None else self._pack_point(*pt))
+
+    def closePath(self):
+        self.h.update(b'Z')
+
+    def endPath(self):
+        self.h.update(b'E')
+
+    def addComponent(self, glyphName, transformation):
+        self.h.update(b'[' + glyphName.encode('utf-8') +
+                      self._pack_transform(*transformation))
+
+def get_unicode_codepoints(font: TTFont) -> np.ndarray:
     """
-    从已加载的字体文件中提取所有Unicode码位。
+    从已加载的字体文件中提取所有Unicode码位，返回去重后已排序的int32数组。
     """
-    codepoints = set()
     if 'cmap' not in font:
         print(f"警告: 字体文件不包含 'cmap' 表。")
-        return codepoints
+        return np.empty(0, np.int32)
 
-    for table in font['cmap'].tables:
-        if isinstance(table, CmapSubtable):
-            codepoints.update(table.cmap.keys())
-    return codepoints
+    arrays = [
+        np.fromiter(table.cmap.keys(), dtype=np.int32, count=len(table.cmap))
+        for table in font['cmap'].tables
+        if isinstance(table, CmapSubtable)
+    ]
+    return np.unique(np.concatenate(arrays)) if arrays else np.empty(0, np.int32)
 
-def format_codepoints(codepoint_set: set[int]) -> str:
+def format_codepoints(codepoint_set) -> str:
     """将码位集合格式化为易读的字符串。"""
-    if not codepoint_set:
+    if len(codepoint_set) == 0:
         return "无"
-    sorted_codepoints = sorted(list(codepoint_set))
+    # NumPy集合运算的结果本身有序，只有set才需要再排序
+    if isinstance(codepoint_set, np.ndarray):
+        sorted_codepoints = codepoint_set
+    else:
+        sorted_codepoints = sorted(codepoint_set)
     # 显示前10个和后10个
     if len(sorted_codepoints) > 20:
         return ", ".join([f"U+{cp:04X}" for cp in sorted_codepoints[:10]]) + \
@@ -31,6 +90,87 @@ def format_codepoints(codepoint_set: set[int]) -> str:
     else:
         return ", ".join([f"U+{cp:04X}" for cp in sorted_codepoints])
 
+def _diff_chunk(old_font_path: str, new_font_path: str,
+                compare_outlines: bool, compare_metrics: bool,
+                codepoints) -> tuple[set, set]:
+    """
+    子进程工作函数：比较一段码位区间的字形轮廓和度量。
+    每个子进程以 lazy=True 打开两个字体，只解析实际用到的表。
+    """
+    old_font = TTFont(old_font_path, lazy=True)
+    new_font = TTFont(new_font_path, lazy=True)
+
+    old_cmap_map = old_font.getBestCmap()
+    new_cmap_map = new_font.getBestCmap()
+
+    changed_outlines = set()
+    changed_metrics = set()
+
+    # 每个码位只做一次cmap查找，轮廓比较和度量比较共享结果
+    pairs = []
+    for codepoint in codepoints:
+        old_glyph_name = old_cmap_map.get(codepoint)
+        new_glyph_name = new_cmap_map.get(codepoint)
+        if old_glyph_name is not None and new_glyph_name is not None:
+            pairs.append((codepoint, old_glyph_name, new_glyph_name))
+
+    if compare_outlines:
+        old_glyph_set = old_font.getGlyphSet()
+        new_glyph_set = new_font.getGlyphSet()
+        old_pen = HashPen()
+        new_pen = HashPen()
+        # 多个码位常映射到同一字形（CJK异体字），按字形名缓存摘要，
+        # 每个物理字形每个字体最多只绘制一次
+        old_digests = {}
+        new_digests = {}
+
+        def _glyph_digest(glyph_set, pen, cache, glyph_name):
+            digest = cache.get(glyph_name)
+            if digest is None:
+                pen.reset()
+                glyph_set[glyph_name].draw(pen)
+                digest = cache[glyph_name] = pen.digest()
+            return digest
+
+        for codepoint, old_glyph_name, new_glyph_name in pairs:
+            try:
+                old_digest = _glyph_digest(old_glyph_set, old_pen,
+                                           old_digests, old_glyph_name)
+                new_digest = _glyph_digest(new_glyph_set, new_pen,
+                                           new_digests, new_glyph_name)
+
+                if old_digest != new_digest:
+                    changed_outlines.add(codepoint)
+            except KeyError as ke:
+                print(f"警告: 无法获取码位 U+{codepoint:04X} 对应的字形 '{ke}' 的轮廓数据。跳过轮廓比较。")
+            except Exception as e:
+                print(f"警告: 比较码位 U+{codepoint:04X} 的字形轮廓时发生错误: {e}. 跳过轮廓比较。")
+
+    if compare_metrics and pairs:
+        # 把 (宽度, 左侧边距) 抽成两个int32矩阵，一次C级比较代替逐码位字典查找
+        old_metrics = old_font['hmtx'].metrics
+        new_metrics = new_font['hmtx'].metrics
+
+        valid_pairs = []
+        for codepoint, old_glyph_name, new_glyph_name in pairs:
+            if old_glyph_name in old_metrics and new_glyph_name in new_metrics:
+                valid_pairs.append((codepoint, old_glyph_name, new_glyph_name))
+            else:
+                print(f"警告: 无法获取码位 U+{codepoint:04X} 对应字形的度量数据。跳过度量比较。")
+
+        if valid_pairs:
+            old_arr = np.array([old_metrics[name] for _, name, _ in valid_pairs],
+                               dtype=np.int32)
+            new_arr = np.array([new_metrics[name] for _, _, name in valid_pairs],
+                               dtype=np.int32)
+            mask = (old_arr != new_arr).any(axis=1)
+            changed_metrics = {pair[0] for pair, changed
+                               in zip(valid_pairs, mask) if changed}
+
+    old_font.close()
+    new_font.close()
+    return changed_outlines, changed_metrics
+
 def compare_fonts(old_font_path: str, new_font_path: str):
     """
     比较两个字体文件，找出cmap表中的新增/减少码位，并检测字形轮廓和度量改动。
@@ -49,8 +189,9 @@ def compare_fonts(old_font_path: str, new_font_path: str):
         return
 
     try:
-        old_font = TTFont(old_font_path)
-        new_font = TTFont(new_font_path)
+        # lazy=True: 只在首次访问时解压对应表，父进程只用到 cmap/hmtx 的存在性
+        old_font = TTFont(old_font_path, lazy=True)
+        new_font = TTFont(new_font_path, lazy=True)
     except Exception as e:
         print(f"错误: 无法加载字体文件。请检查文件是否损坏或路径是否正确。详细信息: {e}")
         return
@@ -67,8 +208,8 @@ def compare_fonts(old_font_path: str, new_font_path: str):
     print("正在分析码位差异 (cmap 表)...")
     print("-" * 60 + "\n")
 
-    added_codepoints = new_codepoints - old_codepoints
-    removed_codepoints = old_codepoints - new_codepoints
+    added_codepoints = np.setdiff1d(new_codepoints, old_codepoints, assume_unique=True)
+    removed_codepoints = np.setdiff1d(old_codepoints, new_codepoints, assume_unique=True)
 
     print("✨ 新增的Unicode码位字形:")
     print(f"  数量: {len(added_codepoints)}")
@@ -83,67 +224,33 @@ def compare_fonts(old_font_path: str, new_font_path: str):
     print("正在分析字形轮廓和度量改动...")
     print("="*60 + "\n")
 
-    common_codepoints = old_codepoints.intersection(new_codepoints)
+    common_codepoints = np.intersect1d(old_codepoints, new_codepoints, assume_unique=True)
 
     changed_outlines = set()
     changed_metrics = set()
 
-    old_cmap_map = old_font.getBestCmap()
-    new_cmap_map = new_font.getBestCmap()
-
-    old_glyph_set = old_font.getGlyphSet()
-    new_glyph_set = new_font.getGlyphSet()
-
-    old_hmtx = old_font['hmtx'] if 'hmtx' in old_font else None
-    new_hmtx = new_font['hmtx'] if 'hmtx' in new_font else None
-
     old_has_outlines = 'glyf' in old_font or 'CFF ' in old_font
     new_has_outlines = 'glyf' in new_font or 'CFF ' in new_font
 
-    if not old_has_outlines or not new_has_outlines:
-        print("警告: 至少有一个字体文件不包含轮廓数据 (glyf 或 CFF 表)，跳过轮廓比较。")
-    else:
-        for codepoint in sorted(list(common_codepoints)):
-            old_glyph_name = old_cmap_map.get(codepoint)
-            new_glyph_name = new_cmap_map.get(codepoint)
-
-            if old_glyph_name is None or new_glyph_name is None:
-                continue
-
-            old_pen = RecordingPen()
-            new_pen = RecordingPen()
+    compare_outlines = old_has_outlines and new_has_outlines
+    compare_metrics = 'hmtx' in old_font and 'hmtx' in new_font
 
-            try:
-                old_glyph_set[old_glyph_name].draw(old_pen)
-                new_glyph_set[new_glyph_name].draw(new_pen)
-
-                if old_pen.value != new_pen.value:
-                    changed_outlines.add(codepoint)
-            except KeyError as ke:
-                print(f"警告: 无法获取码位 U+{codepoint:04X} 对应的字形 '{ke}' 的轮廓数据。跳过轮廓比较。")
-            except Exception as e:
-                print(f"警告: 比较码位 U+{codepoint:04X} 的字形轮廓时发生错误: {e}. 跳过轮廓比较。")
-
-    if not old_hmtx or not new_hmtx:
+    if not compare_outlines:
+        print("警告: 至少有一个字体文件不包含轮廓数据 (glyf 或 CFF 表)，跳过轮廓比较。")
+    if not compare_metrics:
         print("警告: 至少有一个字体文件不包含水平度量数据 (hmtx 表)，跳过度量比较。")
-    else:
-        for codepoint in sorted(list(common_codepoints)):
-            old_glyph_name = old_cmap_map.get(codepoint)
-            new_glyph_name = new_cmap_map.get(codepoint)
 
-            if old_glyph_name is None or new_glyph_name is None:
-                continue
-
-            try:
-                old_width, old_lsb = old_hmtx[old_glyph_name]
-                new_width, new_lsb = new_hmtx[new_glyph_name]
-
-                if old_width != new_width or old_lsb != new_lsb:
-                    changed_metrics.add(codepoint)
-            except KeyError as ke:
-                print(f"警告: 无法获取码位 U+{codepoint:04X} 对应的字形 '{ke}' 的度量数据。跳过度量比较。")
-            except Exception as e:
-                print(f"警告: 比较码位 U+{codepoint:04X} 的度量时发生错误: {e}. 跳过度量比较。")
+    if len(common_codepoints) > 0 and (compare_outlines or compare_metrics):
+        # 各码位的比较相互独立，按CPU核数切块后交给子进程并行处理
+        chunks = [chunk for chunk in
+                  np.array_split(common_codepoints, os.cpu_count() or 1)
+                  if len(chunk) > 0]
+        worker = partial(_diff_chunk, old_font_path, new_font_path,
+                         compare_outlines, compare_metrics)
+        with ProcessPoolExecutor() as executor:
+            for outlines, metrics in executor.map(worker, chunks):
+                changed_outlines |= outlines
+                changed_metrics |= metrics
 
     print("✏️ 发生字形轮廓改动的Unicode码位:")
     print(f"  数量: {len(changed_outlines)}")
@@ -154,7 +261,7 @@ def compare_fonts(old_font_path: str, new_font_path: str):
     print(f"  列表: {format_codepoints(changed_metrics)}\n")
 
     print("="*60)
-    if not added_codepoints and not removed_codepoints and not changed_outlines and not changed_metrics:
+    if len(added_codepoints) == 0 and len(removed_codepoints) == 0 and not changed_outlines and not changed_metrics:
         print("🎉 两个字体文件完全一致，没有发现任何码位或字形改动。")
     else:
         print("✅ 码位和字形改动分析完成。")
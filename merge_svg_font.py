@@ -8,10 +8,41 @@ Usage:
 """
 
 import fontforge
+import multiprocessing
+import operator
 import os
+import re
 import sys
+import tempfile
 from datetime import datetime
 
+# 匹配 uXXXX.svg 形式的文件名，一次捕获十六进制码位
+_SVG_NAME_PATTERN = re.compile(r'^u([0-9A-Fa-f]+)\.svg$')
+
+# 文件数低于该值时不值得启动工作进程
+_PARALLEL_THRESHOLD = 256
+
+def _import_chunk(job):
+    """
+    工作进程：把一段 (码位, SVG路径) 列表导入到临时分片字体并存为SFD。
+    SVG 的 libxml 解析发生在各个工作进程里，主进程只负责合并分片。
+    """
+    entries, shard_path = job
+    shard_font = fontforge.font()
+    processed = 0
+    errors = 0
+    for unicode_val, svg_path in entries:
+        try:
+            glyph = shard_font.createChar(unicode_val)
+            glyph.importOutlines(svg_path)
+            processed += 1
+        except Exception as e:
+            print(f"Error processing {os.path.basename(svg_path)}: {str(e)}")
+            errors += 1
+    shard_font.save(shard_path)
+    shard_font.close()
+    return processed, errors
+
 def create_svg_font(input_dir="input_dir", output_font="output_font.svg", font_name="CustomFont"):
     """
     Create SVG font from individual SVG files
@@ -35,36 +66,57 @@ def create_svg_font(input_dir="input_dir", output_font="output_font.svg", font_n
         processed = 0
         errors = 0
 
-        # 遍历目录中的所有SVG文件
-        for filename in sorted(os.listdir(input_dir)):
-            if not filename.endswith(".svg"):
-                continue
-                
-            try:
-                # 提取文件名中的Unicode码位
-                unicode_str = filename.replace("u", "").replace(".svg", "")
-                unicode_val = int(unicode_str, 16)
-                
-                # 创建新字形
-                glyph = font.createChar(unicode_val)
-                
-                # 导入SVG轮廓
-                svg_path = os.path.join(input_dir, filename)
-                glyph.importOutlines(svg_path)
-                
-                # 优化字形（可选）
-                glyph.removeOverlap()
-                glyph.simplify()
-                glyph.round()
-                
-                processed += 1
-                
-            except ValueError as e:
-                print(f"Error processing {filename}: Invalid Unicode value")
-                errors += 1
-            except Exception as e:
-                print(f"Error processing {filename}: {str(e)}")
-                errors += 1
+        # 用 scandir 流式扫描目录，正则一次提取码位，按码位整数排序
+        entries = []
+        with os.scandir(input_dir) as it:
+            for entry in it:
+                match = _SVG_NAME_PATTERN.match(entry.name)
+                if match:
+                    entries.append((int(match.group(1), 16), entry.path))
+        entries.sort(key=operator.itemgetter(0))
+
+        jobs = min(os.cpu_count() or 1,
+                   max(1, len(entries) // _PARALLEL_THRESHOLD))
+        if jobs > 1:
+            # SVG量大时并行导入：每个工作进程把一段文件导入各自的分片
+            # 字体，主进程用 mergeFonts 合并，绕开逐文件的串行XML解析
+            chunk_size = -(-len(entries) // jobs)  # 向上取整
+            with tempfile.TemporaryDirectory(prefix='merge_svg_') as tmp_dir:
+                job_list = [
+                    (entries[start:start + chunk_size],
+                     os.path.join(tmp_dir, f"shard_{start}.sfd"))
+                    for start in range(0, len(entries), chunk_size)
+                ]
+                with multiprocessing.Pool(len(job_list)) as pool:
+                    results = pool.map(_import_chunk, job_list)
+                for chunk_processed, chunk_errors in results:
+                    processed += chunk_processed
+                    errors += chunk_errors
+                for _, shard_path in job_list:
+                    font.mergeFonts(shard_path)
+        else:
+            # 遍历目录中的所有SVG文件
+            for unicode_val, svg_path in entries:
+                try:
+                    # 创建新字形
+                    glyph = font.createChar(unicode_val)
+
+                    # 导入SVG轮廓
+                    glyph.importOutlines(svg_path)
+
+                    processed += 1
+
+                except Exception as e:
+                    print(f"Error processing {os.path.basename(svg_path)}: {str(e)}")
+                    errors += 1
+
+        # 导入完成后一次性优化所有字形，
+        # 避免逐字形调用 removeOverlap/simplify/round 的重复开销
+        if processed > 0:
+            font.selection.all()
+            font.removeOverlap()
+            font.simplify(0.1)
+            font.round()
 
         # 设置字体参数
         font.ascent = 800
@@ -27,11 +27,19 @@ Output 输出:
 
 import sys
 import os
+import hashlib
+import json
+import multiprocessing
+import tempfile
+import threading
 import time
 import argparse
 import logging
 from typing import List, Optional, Tuple
 
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -45,6 +53,18 @@ try:
 except ModuleNotFoundError:
     logger.error("警告：当前没有使用 `fontforge` 运行，功能无法使用")
 
+# simplify 的标志元组提升为模块级常量，避免在逐字形热路径上反复构造
+_SIMPLIFY_PRIMARY = ('mergelines', 'smoothcurves', 'removesingletonpoints')
+_SIMPLIFY_EXT = ('mergelines', 'smoothcurves', 'choosehv', 'removesingletonpoints',
+                 'setstarttoextremum', 'forcelines')
+
+# 进度行模板：ANSI着色和中文标签在模块加载时一次性编码成bytes
+_PROGRESS_TEMPLATE = (
+    "\r\033[34m进度(%d/%d)\033[32m: [%s] \033[35m(%.1f%%)\033[0m "
+    "\033[33m⏱️ %s \033[36m⏳ %s \033[0m"
+    "⚡ 当前处理: %s"
+).encode('utf-8')
+
 class TimeFormatter:
     """时间格式化工具类"""
 
@@ -60,11 +80,35 @@ class TimeFormatter:
             hours = seconds / 3600
             return f"{hours:.1f}小时"
 
+def _output_needs_ps_hints(input_file: str) -> bool:
+    """输出格式（与输入同扩展名）是否会保留 PostScript hint。"""
+    return os.path.splitext(input_file)[1].lower() in ('.otf', '.cff')
+
+
+def glyph_outline_hash(glyph) -> str:
+    """计算字形轮廓数据的稳定哈希，用于跨运行识别未变化的字形。"""
+    try:
+        outline_data = [
+            (point.x, point.y, point.type)
+            for contour in glyph.foreground
+            for point in contour
+        ]
+        reference_data = [(ref[0], tuple(ref[1])) for ref in glyph.references]
+    except (AttributeError, TypeError):
+        return ""
+    payload = repr((outline_data, reference_data, glyph.width)).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
 class GlyphProcessor:
     """字形处理器类，处理单个字形的优化操作"""
 
-    def __init__(self, simplify_value: float = 0.5):
+    def __init__(self, simplify_value: float = 0.5, aggressive: bool = False,
+                 hint: bool = True):
         self.simplify_value = simplify_value
+        self.aggressive = aggressive
+        # PS hint 只对 CFF 类输出有意义；TTF 输出由保存阶段统一生成指令
+        self.hint = hint
 
     @staticmethod
     def get_glyph_info(glyph) -> str:
@@ -91,61 +135,72 @@ class GlyphProcessor:
 
     @staticmethod
     def process_line_endpoints(glyph) -> None:
-        """处理线条端点，优化接近水平或垂直的线段"""
+        """处理线条端点，优化接近水平或垂直的线段
+
+        相邻点的坐标差用NumPy一次性算出，只对命中的下标回写点类型，
+        避免在Python里逐点比较。
+        """
+        corner = fontforge.splineCorner
         contours = glyph.foreground
         for contour in contours:
-            prev_point = None
-            for point in contour:
-                if prev_point is not None:
-                    if (abs(point.x - prev_point.x) < 0.1 or 
-                        abs(point.y - prev_point.y) < 0.1):
-                        point.type = fontforge.splineCorner
-                        prev_point.type = fontforge.splineCorner
-                prev_point = point
+            points = list(contour)
+            if len(points) < 2:
+                continue
+
+            # 一趟循环同时取出 x/y，每个点对象只经过一次属性访问；
+            # float64 与点坐标的原生双精度一致，避免临界值附近的舍入误判
+            coords = np.array([(point.x, point.y) for point in points],
+                              dtype=np.float64)
+            deltas = np.abs(np.diff(coords, axis=0))
+            near_axis = (deltas[:, 0] < 0.1) | (deltas[:, 1] < 0.1)
+
+            for index in np.flatnonzero(near_axis):
+                points[index].type = corner
+                points[index + 1].type = corner
 
     def process_glyph(self, glyph) -> None:
-        """应用所有优化处理到单个字形"""
+        """应用所有优化处理到单个字形
+
+        每类操作只做一趟：simplify/removeOverlap/round/autoHint 都是
+        FontForge C 核心里 O(轮廓点数) 的全量遍历，重复调用只有开销。
+        """
         # 解除复合字形引用
         self.process_compound_glyph(glyph)
 
-        # 初步简化
-        glyph.simplify(0.1, ('mergelines', 'choosehv'), 0.1, 0.1, 0)
+        # 没有轮廓的字形（空格、.notdef 等）无需任何简化处理
+        try:
+            if len(glyph.foreground) == 0:
+                return
+        except (AttributeError, TypeError):
+            return
 
         # 处理线段端点
         self.process_line_endpoints(glyph)
 
-        # 主要简化和优化步骤
-        glyph.simplify(self.simplify_value, 
-                     ('mergelines', 'smoothcurves', 'removesingletonpoints'), 
-                     0.3, 0, 0.5)
+        # 拓扑规范化；removeOverlap/autoHint 由字体级批量收尾，
+        # 坐标取整由 generate 的 'round' 标志在输出时完成
+        glyph.correctDirection()
         glyph.canonicalContours()
         glyph.canonicalStart()
-        glyph.removeOverlap()
-        glyph.correctDirection()
-        glyph.simplify(self.simplify_value, 
-                     ('mergelines', 'smoothcurves'), 
-                     0.3, 0, 0.5)
-        glyph.round()
-        glyph.autoHint()
 
-        # 扩展优化
-        self.optimize_glyph_extension(glyph)
+        # 单趟简化：一次覆盖全部简化目标
+        glyph.simplify(self.simplify_value, _SIMPLIFY_PRIMARY, 0.3, 0, 0.5)
+
+        # 扩展优化（仅激进模式）
+        if self.aggressive:
+            self.optimize_glyph_extension(glyph)
 
     @staticmethod
     def optimize_glyph_extension(glyph) -> None:
-        """应用扩展优化处理"""
-        glyph.simplify(0.5, 
-                     ('mergelines', 'smoothcurves', 'choosehv', 'removesingletonpoints'), 
-                     0.3, 0, 0.5)
-        glyph.width = int(round(glyph.width / 10.0) * 10)
+        """应用扩展优化处理（autoHint 由主流程统一收尾）"""
+        # forcelines/setstarttoextremum 并入主 simplify，省掉一次全轮廓遍历
+        glyph.simplify(0.5, _SIMPLIFY_EXT, 0.3, 0, 0.5)
+        # 纯整数运算取整到10的倍数，省掉往返浮点的转换
+        glyph.width = (glyph.width + 5) // 10 * 10
         glyph.balance()
-        glyph.autoHint()
 
-        glyph.simplify(0, ('setstarttoextremum', 'removesingletonpoints', 'forcelines'))
         glyph.cluster(0.5)
-        glyph.removeOverlap()
         glyph.removePosSub("*")
-        glyph.round()
 
 
 class ProgressTracker:
@@ -153,16 +208,31 @@ class ProgressTracker:
 
     def __init__(self, total: int):
         self.total = total
-        self.start_time = time.time()
+        self.start_time = time.monotonic()
         self.last_update_time = self.start_time
         self.time_formatter = TimeFormatter()
+        # 进度条复用同一个可写缓冲区，避免每次重绘拼接两段字符串
+        self._bar = bytearray(b'-' * 30)
+        # 耗时/ETA文本按整秒缓存，同一秒内的重绘直接复用已编码bytes
+        self._elapsed_int = -1
+        self._elapsed_bytes = b''
+        self._remaining_int = -1
+        self._remaining_bytes = b''
 
         logger.info(f"开始处理字体，共 {total} 个字形...")
-        print("进度", end="")
 
-    def update(self, current: int, glyph_info: str) -> None:
+    def update(self, current: int, glyph) -> None:
         """更新并显示进度"""
-        current_time = time.time()
+        # 每64个字形才取一次时间，避免逐字形的时钟系统调用
+        if current & 63 and current != self.total:
+            return
+
+        # 限制更新频率，减少屏幕刷新；耗时/ETA和字形信息只在真正重绘时计算
+        current_time = time.monotonic()
+        if current_time - self.last_update_time < 0.2 and current != self.total:
+            return
+
+        glyph_info = GlyphProcessor.get_glyph_info(glyph)
         elapsed_time = current_time - self.start_time
         progress = current / self.total if self.total > 0 else 0
 
@@ -174,35 +244,43 @@ class ProgressTracker:
         else:
             estimated_remaining_time = 0
 
-        # 限制更新频率，减少屏幕刷新
-        if current_time - self.last_update_time >= 0.2:
-            self._display_progress(
-                current, 
-                progress, 
-                elapsed_time, 
-                estimated_remaining_time, 
-                glyph_info
-            )
-            self.last_update_time = current_time
+        self._display_progress(
+            current,
+            progress,
+            elapsed_time,
+            estimated_remaining_time,
+            glyph_info
+        )
+        self.last_update_time = current_time
 
     def _display_progress(self, current: int, progress: float, 
                          elapsed_time: float, remaining_time: float, 
                          glyph_info: str) -> None:
         """显示进度条和相关信息"""
-        bar_length = 30
-        filled_length = int(bar_length * progress)
-        bar = "#" * filled_length + "-" * (bar_length - filled_length)
-
-        formatted_elapsed = self.time_formatter.format_time(elapsed_time)
-        formatted_remaining = self.time_formatter.format_time(remaining_time)
-
-        print(f"\r进度({current}/{self.total}): [{bar}] ({progress:.1%}) "
-              f"⏱️ {formatted_elapsed} ⏳ {formatted_remaining} "
-              f"⚡ 当前处理: {glyph_info}", end="", flush=True)
+        filled_length = int(len(self._bar) * progress)
+        self._bar[:filled_length] = b'#' * filled_length
+        self._bar[filled_length:] = b'-' * (len(self._bar) - filled_length)
+
+        elapsed_int = int(elapsed_time)
+        if elapsed_int != self._elapsed_int:
+            self._elapsed_int = elapsed_int
+            self._elapsed_bytes = \
+                self.time_formatter.format_time(elapsed_time).encode()
+        remaining_int = int(remaining_time)
+        if remaining_int != self._remaining_int:
+            self._remaining_int = remaining_int
+            self._remaining_bytes = \
+                self.time_formatter.format_time(remaining_time).encode()
+
+        # 直接写文件描述符1，绕开 TextIOWrapper 的加锁、编码和缓冲
+        os.write(1, _PROGRESS_TEMPLATE % (
+            current, self.total, bytes(self._bar), progress * 100,
+            self._elapsed_bytes, self._remaining_bytes,
+            glyph_info.encode()))
 
     def complete(self) -> None:
         """完成进度显示"""
-        total_time = time.time() - self.start_time
+        total_time = time.monotonic() - self.start_time
         bar = "=" * 30
         print(f"\n进度({self.total}/{self.total}): [{bar}] (100%) "
               f"⏱️ 总用时: {self.time_formatter.format_time(total_time)}")
@@ -211,66 +289,268 @@ class ProgressTracker:
 class FontOptimizer:
     """字体优化器类，管理整个字体文件的处理流程"""
 
-    def __init__(self, simplify_value: float = 0.5):
+    def __init__(self, simplify_value: float = 0.5, aggressive: bool = False,
+                 workers: int = 1):
         self.simplify_value = simplify_value
-        self.glyph_processor = GlyphProcessor(simplify_value)
+        self.aggressive = aggressive
+        self.workers = workers
+        self.glyph_processor = GlyphProcessor(simplify_value, aggressive)
 
     def process_font(self, input_file: str) -> Optional[str]:
         """处理整个字体文件，优化所有字形"""
+        if self.workers > 1:
+            output_file = self._process_font_parallel(input_file)
+            if output_file is not None:
+                return output_file
+            logger.warning("并行处理不可用，回退到串行模式")
+
         try:
             font = fontforge.open(input_file)
         except OSError as e:
             logger.error(f"错误：无法打开字体文件 - {e}")
             return None
 
-        glyphs = list(font.glyphs())
-        total_glyphs = len(glyphs)
+        # 只数一遍字形总数，循环时直接消费生成器，
+        # 不把全部字形包装对象一次性驻留在内存里
+        total_glyphs = sum(1 for _ in font.glyphs())
 
         if total_glyphs == 0:
             logger.warning("警告：没有找到可处理的字形")
             return None
 
+        # autoHint 只在输出会保留 PS hint 时逐字形执行
+        self.glyph_processor.hint = _output_needs_ps_hints(input_file)
+
+        # 旁路哈希缓存：记录上次运行各字形优化后的轮廓哈希，
+        # 当前轮廓与之一致的字形已处于优化形态，可整体跳过
+        cache_path = f"{input_file}.optcache.json"
+        cache = self._load_hash_cache(cache_path)
+        new_cache = {}
+        skipped = 0
+
         # 初始化进度跟踪器
         progress = ProgressTracker(total_glyphs)
 
+        # 预绑定热循环里要调用的方法，减少每个字形的属性查找开销
+        process_glyph = self.glyph_processor.process_glyph
+        update_progress = progress.update
+
         # 处理每个字形
-        for index, glyph in enumerate(glyphs):
-            glyph_info = self.glyph_processor.get_glyph_info(glyph)
-            progress.update(index + 1, glyph_info)
+        for index, glyph in enumerate(font.glyphs()):
+            update_progress(index + 1, glyph)
 
             try:
-                self.glyph_processor.process_glyph(glyph)
+                # 既无引用也无轮廓的字形（空格、未赋值槽位）整条流水线都
+                # 不会产生效果，直接跳过
+                if not glyph.references and len(glyph.foreground) == 0:
+                    skipped += 1
+                    continue
+
+                outline_hash = glyph_outline_hash(glyph)
+                if outline_hash and cache.get(glyph.glyphname) == outline_hash:
+                    new_cache[glyph.glyphname] = outline_hash
+                    skipped += 1
+                    continue
+
+                process_glyph(glyph)
+                new_cache[glyph.glyphname] = glyph_outline_hash(glyph)
             except Exception as e:
+                glyph_info = self.glyph_processor.get_glyph_info(glyph)
                 logger.warning(f"处理字形 {glyph_info} 时出错: {e}")
                 continue
 
         # 完成进度显示
         progress.complete()
 
-        # 保存新字体
-        return self._save_font(font, input_file)
+        # 选区级批量收尾：逐字形的 removeOverlap/autoHint 摊平成整体各一次
+        self._finalize_glyph_batch(font, self.glyph_processor.hint)
+
+        if skipped:
+            logger.info(f"跳过 {skipped} 个无需处理的字形（空字形或命中哈希缓存）")
+
+        # 保存新字体，生成期间顺带写回哈希缓存
+        return self._save_font(
+            font, input_file,
+            post_save=lambda: self._save_hash_cache(cache_path, new_cache))
+
+    @staticmethod
+    def _finalize_glyph_batch(font, hint: bool) -> None:
+        """对选区内全部字形批量执行 removeOverlap/autoHint。
+
+        坐标取整交给 generate 的 'round' 标志在输出时一并完成，
+        不再单独做一趟 round() 的全轮廓遍历。
+        """
+        # selection 属性每次访问都会新建包装对象，取成局部变量复用
+        selection = font.selection
+        selection.all()
+        font.removeOverlap()
+        if hint:
+            font.autoHint()
+
+    @staticmethod
+    def _load_hash_cache(cache_path: str) -> dict:
+        """读取上次运行留下的字形哈希缓存，不存在或损坏时返回空。"""
+        try:
+            with open(cache_path, encoding='utf-8') as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_hash_cache(cache_path: str, cache: dict) -> None:
+        """原子地写回字形哈希缓存。"""
+        try:
+            tmp_path = f"{cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(cache, cache_file)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"写入哈希缓存失败: {e}")
+
+    def _process_font_parallel(self, input_file: str) -> Optional[str]:
+        """
+        把字形按区间分片交给 multiprocessing 工作进程并行优化。
 
-    def _save_font(self, font, input_file: str) -> str:
-        """保存处理后的字体文件"""
+        每个工作进程打开同一份源字体，只处理自己的 [start, end) 区间，
+        并把该区间的字形存成SFD分片；父进程用 mergeFonts 合并所有
+        分片后统一生成输出。失败时返回 None 以便回退串行路径。
+        """
+        try:
+            font = fontforge.open(input_file)
+        except OSError as e:
+            logger.error(f"错误：无法打开字体文件 - {e}")
+            return None
+        total_glyphs = sum(1 for _ in font.glyphs())
+        font.close()
+
+        if total_glyphs == 0:
+            logger.warning("警告：没有找到可处理的字形")
+            return None
+
+        workers = min(self.workers, total_glyphs)
+        chunk_size = -(-total_glyphs // workers)  # 向上取整
+
+        logger.info(f"开始并行处理字体，共 {total_glyphs} 个字形，"
+                    f"{workers} 个工作进程...")
+
+        with tempfile.TemporaryDirectory(prefix='optimize_glyph_') as tmp_dir:
+            jobs = [
+                (input_file, start, min(start + chunk_size, total_glyphs),
+                 os.path.join(tmp_dir, f"shard_{start}.sfd"),
+                 self.simplify_value, self.aggressive)
+                for start in range(0, total_glyphs, chunk_size)
+            ]
+
+            try:
+                with multiprocessing.Pool(len(jobs)) as pool:
+                    shards = pool.map(_optimize_shard, jobs)
+            except Exception as e:
+                logger.error(f"并行处理失败: {e}")
+                return None
+
+            if not all(os.path.exists(shard) for shard in shards):
+                logger.error("部分工作进程失败")
+                return None
+
+            merged_font = fontforge.open(shards[0])
+            for shard_path in shards[1:]:
+                merged_font.mergeFonts(shard_path)
+
+            return self._save_font(merged_font, input_file)
+
+    def _save_font(self, font, input_file: str, post_save=None) -> Optional[str]:
+        """保存处理后的字体文件
+
+        font.generate 在后台线程执行，期间运行 post_save 回调
+        （如写回哈希缓存），让磁盘写出和收尾工作相互重叠。
+        """
         logger.info("新字体保存中...")
 
         file_name, file_extension = os.path.splitext(input_file)
         output_file = f"{file_name}_merge_glyphs{file_extension}"
 
+        # 非 CFF 输出丢弃 PS hint，改为在保存前统一生成 TrueType 指令
+        if not _output_needs_ps_hints(input_file):
+            try:
+                selection = font.selection
+                selection.all()
+                font.autoInstr()
+            except Exception as e:
+                logger.warning(f"生成 TrueType 指令失败: {e}")
+
+        errors = []
+
+        def _generate():
+            try:
+                font.generate(output_file,
+                              flags=('opentype', 'round', 'dummy-dsig', 'apple'))
+            except Exception as e:
+                errors.append(e)
+
+        save_thread = threading.Thread(target=_generate)
+        save_thread.start()
+        if post_save is not None:
+            post_save()
+        save_thread.join()
+
+        if errors:
+            logger.error(f"保存字体失败: {errors[0]}")
+            return None
+        logger.info(f"新字体已保存为: {output_file}")
+        return output_file
+
+def _optimize_shard(job) -> str:
+    """
+    工作进程函数：只优化 [start, end) 区间内的字形，
+    并把该区间存成SFD分片供父进程合并。
+    """
+    input_file, start, end, shard_path, simplify_value, aggressive = job
+
+    font = fontforge.open(input_file)
+    processor = GlyphProcessor(simplify_value, aggressive,
+                               _output_needs_ps_hints(input_file))
+    glyph_names = [glyph.glyphname for glyph in font.glyphs()]
+
+    for glyph_name in glyph_names[start:end]:
         try:
-            font.generate(output_file, 
-                         flags=('opentype', 'round', 'dummy-dsig', 'apple'))
-            logger.info(f"新字体已保存为: {output_file}")
-            return output_file
+            glyph = font[glyph_name]
+            # 空字形的整条流水线都不会产生效果，直接跳过
+            if not glyph.references and len(glyph.foreground) == 0:
+                continue
+            processor.process_glyph(glyph)
         except Exception as e:
-            logger.error(f"保存字体失败: {e}")
-            return None
+            logger.warning(f"处理字形 {glyph_name} 时出错: {e}")
+
+    # 分片里只保留本区间的字形，合并时互不重叠
+    for glyph_name in glyph_names[:start] + glyph_names[end:]:
+        try:
+            font.removeGlyph(glyph_name)
+        except Exception:
+            pass
+
+    # 本区间字形的 removeOverlap/autoHint 同样批量收尾
+    FontOptimizer._finalize_glyph_batch(font, processor.hint)
+
+    font.save(shard_path)
+    font.close()
+    return shard_path
+
+
+def _optimize_one_font(job) -> Optional[str]:
+    """工作进程函数：在独立进程里完整处理一个字体文件。"""
+    font_file, simplify_value, aggressive = job
+    return FontOptimizer(simplify_value, aggressive).process_font(font_file)
+
 
 def main():
     parser = argparse.ArgumentParser(description='字体轮廓优化工具')
-    parser.add_argument('font_file', nargs='?', help='字体文件路径')
-    parser.add_argument('-s', '--simplify', type=float, default=0.5, 
+    parser.add_argument('font_file', nargs='*', help='字体文件路径（可多个）')
+    parser.add_argument('-s', '--simplify', type=float, default=0.5,
                       help='simplify 参数值 (默认: 0.5)')
+    parser.add_argument('-a', '--aggressive', action='store_true',
+                      help='启用激进的扩展优化（额外的简化/对齐，速度较慢）')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                      help='并行工作进程数 (默认: 1，即串行)')
 
     args = parser.parse_args()
 
@@ -309,13 +589,29 @@ def main():
 
     try:
         logger.info(f"使用 simplify 参数值: {args.simplify}")
-        optimizer = FontOptimizer(args.simplify)
-        output_file = optimizer.process_font(args.font_file)
-
-        if output_file:
-            logger.info("处理完成！")
+        if len(args.font_file) > 1:
+            # 多字体批处理：一个字体一个工作进程，随核心数线性加速；
+            # 进程内保持串行，避免与 -w 的字形级并行嵌套
+            jobs = [(font_file, args.simplify, args.aggressive)
+                    for font_file in args.font_file]
+            max_workers = min(len(jobs), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_optimize_one_font, jobs))
+            failed = [font_file for font_file, output_file
+                      in zip(args.font_file, results) if not output_file]
+            if failed:
+                logger.error(f"处理失败：{', '.join(failed)}")
+            else:
+                logger.info(f"全部 {len(jobs)} 个字体处理完成！")
         else:
-            logger.error("处理失败！")
+            optimizer = FontOptimizer(args.simplify, args.aggressive,
+                                      args.workers)
+            output_file = optimizer.process_font(args.font_file[0])
+
+            if output_file:
+                logger.info("处理完成！")
+            else:
+                logger.error("处理失败！")
     except Exception as e:
         logger.error(f"发生严重错误：{str(e)}")
         input("按回车键退出...")